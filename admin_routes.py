@@ -1,10 +1,10 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
 from datetime import datetime, timedelta
 import sqlite3
 from database import (
     get_all_lots, create_parking_lot, lot_has_occupied_spots,
     delete_lot_by_id, get_all_users, get_user_history,
-    get_connection
+    get_connection, get_occupancy_curve, lot_exists
 )
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
@@ -126,4 +126,45 @@ def view_users():
         return render_template('view_users.html', users=users)
     except Exception as e:
         flash(f'Error loading users: {str(e)}', 'error')
-        return redirect(url_for('admin.dashboard'))
\ No newline at end of file
+        return redirect(url_for('admin.dashboard'))
+
+@admin_bp.route('/api/occupancy/<int:lot_id>')
+def occupancy_curve(lot_id):
+    if not lot_exists(lot_id):
+        return jsonify({'error': 'parking lot not found'}), 404
+
+    try:
+        end = datetime.strptime(request.args['end'], '%Y-%m-%d') + timedelta(days=1, seconds=-1) \
+            if 'end' in request.args else datetime.now()
+        start = datetime.strptime(request.args['start'], '%Y-%m-%d') \
+            if 'start' in request.args else end - timedelta(days=1)
+    except ValueError:
+        return jsonify({'error': 'start and end must be YYYY-MM-DD'}), 400
+
+    if start > end:
+        return jsonify({'error': 'start must not be after end'}), 400
+
+    resolution = request.args.get('resolution')
+    if resolution is None:
+        resolution = 'hourly' if end - start <= timedelta(days=7) else 'daily'
+    if resolution not in ('hourly', 'daily'):
+        return jsonify({'error': 'resolution must be hourly or daily'}), 400
+
+    curve = get_occupancy_curve(lot_id, start, end, resolution)
+    points = [{
+        'bucket': row['bucket'],
+        'avg_occupied': row['avg_occupied'],
+        'peak_occupied': row['peak_occupied'],
+        'total': row['total'],
+        'occupancy_rate': (row['avg_occupied'] / row['total']) * 100 if row['total'] > 0 else 0
+    } for row in curve]
+    peak = max(points, key=lambda p: p['peak_occupied'], default=None)
+
+    return jsonify({
+        'lot_id': lot_id,
+        'resolution': resolution,
+        'start': start.strftime('%Y-%m-%d %H:%M:%S'),
+        'end': end.strftime('%Y-%m-%d %H:%M:%S'),
+        'points': points,
+        'peak_bucket': peak['bucket'] if peak else None
+    })
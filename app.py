@@ -3,12 +3,28 @@ from datetime import datetime
 from controllers.auth import auth_bp
 from controllers.admin_routes import admin_bp
 from controllers.user import user_bp
-from database import init_db
+from database import init_db, record_occupancy_sample, OCCUPANCY_SAMPLE_INTERVAL
+from config import Config
 import os
+import threading
 
-def create_app():
+def start_occupancy_sampler(interval=OCCUPANCY_SAMPLE_INTERVAL):
+    stop = threading.Event()
+
+    def run():
+        while not stop.is_set():
+            record_occupancy_sample()
+            stop.wait(interval)
+
+    threading.Thread(target=run, name='occupancy-sampler', daemon=True).start()
+    return stop
+
+def create_app(debug=None):
     app = Flask(__name__)
+    app.config.from_object(Config)
     app.secret_key = 'supersecretkey'
+    if debug is not None:
+        app.debug = debug
     
     @app.template_filter('datetimeformat')
     def format_datetime(value, format='%Y-%m-%d %H:%M:%S'):
@@ -26,13 +42,18 @@ def create_app():
 
     init_db()
 
+    # Under the debug reloader only the child process that serves requests
+    # samples, not the watcher parent.
+    if app.config['OCCUPANCY_SAMPLER'] and (not app.debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+        app.extensions['occupancy_sampler'] = start_occupancy_sampler()
+
     app.register_blueprint(auth_bp)
     app.register_blueprint(admin_bp, url_prefix='/admin')
     app.register_blueprint(user_bp, url_prefix='/user')
 
     return app
 
-app = create_app()
+app = create_app(debug=True if __name__ == '__main__' else None)
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run()
\ No newline at end of file
@@ -1,3 +1,4 @@
 class Config:
     SECRET_KEY = 'supersecretkey'
     DB_NAME = 'instance/db.sqlite3'
+    OCCUPANCY_SAMPLER = True
@@ -1,10 +1,46 @@
 import sqlite3
 import os
-from datetime import datetime, timedelta 
+import threading
+import time
+from datetime import datetime, timedelta, timezone
 from math import ceil
 
 DB_NAME = 'instance/db.sqlite3'
 
+OCCUPANCY_SAMPLE_INTERVAL = 300
+OCCUPANCY_RAW_RETENTION = timedelta(days=2)
+OCCUPANCY_HOURLY_RETENTION = timedelta(days=90)
+OCCUPANCY_DAILY_RETENTION = timedelta(days=730)
+
+class _Record:
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for field, value in zip(self.__slots__, values):
+            setattr(self, field, value)
+
+    def __getitem__(self, key):
+        return getattr(self, self.__slots__[key] if isinstance(key, int) else key)
+
+class LotRecord(_Record):
+    __slots__ = ('id', 'name', 'price_per_hour', 'address', 'pin_code', 'total_spots')
+
+class UserProfile(_Record):
+    __slots__ = ('username', 'email', 'mobile', 'vehicle_reg_no', 'address', 'pincode')
+
+# Cache invalidation only reaches this process. With several workers,
+# changes made elsewhere show up after at most the TTL below.
+LOT_CACHE_TTL = 60
+USER_CACHE_TTL = LOT_CACHE_TTL
+USER_CACHE_MAX = 1024
+
+_lot_cache_lock = threading.Lock()
+_lot_cache = None
+_lot_cache_loaded_at = 0.0
+_user_cache_lock = threading.Lock()
+_user_cache = {}
+_user_cache_version = 0
+
 def get_connection():
     return sqlite3.connect(DB_NAME)
 
@@ -77,6 +113,25 @@ def init_db():
         FOREIGN KEY (spot_id) REFERENCES parking_spots(id)
     )''')
 
+    cur.execute('''CREATE TABLE IF NOT EXISTS occupancy_samples (
+        lot_id INTEGER NOT NULL,
+        sampled_at TEXT NOT NULL,
+        occupied INTEGER NOT NULL,
+        total INTEGER NOT NULL,
+        PRIMARY KEY (lot_id, sampled_at)
+    ) WITHOUT ROWID''')
+
+    for table in ('occupancy_hourly', 'occupancy_daily'):
+        cur.execute(f'''CREATE TABLE IF NOT EXISTS {table} (
+            lot_id INTEGER NOT NULL,
+            bucket TEXT NOT NULL,
+            samples INTEGER NOT NULL,
+            occupied_sum INTEGER NOT NULL,
+            peak_occupied INTEGER NOT NULL,
+            total INTEGER NOT NULL,
+            PRIMARY KEY (lot_id, bucket)
+        ) WITHOUT ROWID''')
+
     cur.execute("SELECT * FROM users WHERE username = ?", ('admin',))
     if not cur.fetchone():
         cur.execute("INSERT INTO users (username, password, is_admin) VALUES (?, ?, ?)",
@@ -96,16 +151,31 @@ def get_user_by_credentials(username, password):
     return user
 
 def get_user_by_id(user_id):
+    entry = _user_cache.get(user_id)
+    if entry is not None and time.monotonic() - entry[1] < USER_CACHE_TTL:
+        return entry[0]
+
+    version = _user_cache_version
     conn = get_connection()
-    conn.row_factory = sqlite3.Row
     cur = conn.cursor()
     cur.execute('''
         SELECT username, email, mobile, vehicle_reg_no, address, pincode
         FROM users
         WHERE id = ?
     ''', (user_id,))
-    user = cur.fetchone()
+    row = cur.fetchone()
     conn.close()
+    if not row:
+        return None
+
+    user = UserProfile(*row)
+    with _user_cache_lock:
+        # Skip caching if a profile update landed while we were reading.
+        if version == _user_cache_version:
+            _user_cache.pop(user_id, None)
+            if len(_user_cache) >= USER_CACHE_MAX:
+                _user_cache.pop(next(iter(_user_cache)))
+            _user_cache[user_id] = (user, time.monotonic())
     return user
 
 def register_user(username, password, email, mobile, vehicle_reg_no, address, pincode):
@@ -124,6 +194,7 @@ def register_user(username, password, email, mobile, vehicle_reg_no, address, pi
         conn.close()
         
 def update_user_profile(user_id, username, email, vehicle_reg_no, address, pincode, mobile):
+    global _user_cache_version
     conn = get_connection()
     cur = conn.cursor()
     cur.execute('''
@@ -133,14 +204,38 @@ def update_user_profile(user_id, username, email, vehicle_reg_no, address, pinco
     ''', (username, email, vehicle_reg_no, address, pincode, mobile, user_id))
     conn.commit()
     conn.close()
+    with _user_cache_lock:
+        _user_cache_version += 1
+        _user_cache.pop(user_id, None)
+
+# Lots can be up to LOT_CACHE_TTL seconds stale across workers, so nothing
+# that must be exact (e.g. booking) should trust the cache alone.
+def _load_lots():
+    global _lot_cache, _lot_cache_loaded_at
+    lots = _lot_cache
+    if lots is not None and time.monotonic() - _lot_cache_loaded_at < LOT_CACHE_TTL:
+        return lots
+
+    with _lot_cache_lock:
+        if _lot_cache is None or time.monotonic() - _lot_cache_loaded_at >= LOT_CACHE_TTL:
+            conn = get_connection()
+            cur = conn.cursor()
+            cur.execute("SELECT id, name, price_per_hour, address, pin_code, total_spots FROM parking_lots")
+            _lot_cache = {row[0]: LotRecord(*row) for row in cur.fetchall()}
+            _lot_cache_loaded_at = time.monotonic()
+            conn.close()
+        return _lot_cache
+
+def invalidate_lot_cache():
+    global _lot_cache
+    with _lot_cache_lock:
+        _lot_cache = None
 
 def get_all_lots():
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM parking_lots")
-    lots = cur.fetchall()
-    conn.close()
-    return lots
+    return list(_load_lots().values())
+
+def get_lot_by_id(lot_id):
+    return _load_lots().get(lot_id)
 
 def create_parking_lot(name, price, address, pin_code, total_spots):
     conn = get_connection()
@@ -152,6 +247,7 @@ def create_parking_lot(name, price, address, pin_code, total_spots):
         cur.execute("INSERT INTO parking_spots (lot_id, status) VALUES (?, 'A')", (lot_id,))
     conn.commit()
     conn.close()
+    invalidate_lot_cache()
 
 def lot_has_occupied_spots(lot_id):
     conn = get_connection()
@@ -161,13 +257,24 @@ def lot_has_occupied_spots(lot_id):
     conn.close()
     return count > 0
 
+def lot_exists(lot_id):
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT 1 FROM parking_lots WHERE id=?", (lot_id,))
+    row = cur.fetchone()
+    conn.close()
+    return row is not None
+
 def delete_lot_by_id(lot_id):
     conn = get_connection()
     cur = conn.cursor()
+    for table in ('occupancy_samples', 'occupancy_hourly', 'occupancy_daily'):
+        cur.execute(f"DELETE FROM {table} WHERE lot_id=?", (lot_id,))
     cur.execute("DELETE FROM parking_spots WHERE lot_id=?", (lot_id,))
     cur.execute("DELETE FROM parking_lots WHERE id=?", (lot_id,))
     conn.commit()
     conn.close()
+    invalidate_lot_cache()
 
 def get_all_users():
     conn = get_connection()
@@ -211,15 +318,18 @@ def reserve_spot(lot_id, user_id):
     cur = conn.cursor()
     
     try:
-        cur.execute("SELECT id FROM parking_spots WHERE lot_id=? AND status='A' LIMIT 1", (lot_id,))
+        cur.execute("""
+            SELECT s.id, l.price_per_hour
+            FROM parking_spots s
+            JOIN parking_lots l ON s.lot_id = l.id
+            WHERE s.lot_id=? AND s.status='A'
+            LIMIT 1
+        """, (lot_id,))
         spot = cur.fetchone()
         if not spot:
             return False
 
-        spot_id = spot[0]
-        
-        cur.execute("SELECT price_per_hour FROM parking_lots WHERE id=?", (lot_id,))
-        price_per_hour = cur.fetchone()[0]
+        spot_id, price_per_hour = spot
         
         now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         cur.execute("""
@@ -380,4 +490,100 @@ def get_user_stats(user_id):
         print(f"Error getting user stats: {e}")
         return None
     finally:
-        conn.close()
\ No newline at end of file
+        conn.close()
+
+def _hour_bucket(dt):
+    # Floor to the local hour (keeping fold), then key by that instant in UTC.
+    hour = dt.replace(minute=0, second=0, microsecond=0)
+    return hour.astimezone(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+def record_occupancy_sample(now=None):
+    # Raw samples and hourly buckets are keyed in UTC so the repeated hour
+    # at the end of DST does not collide with the first pass; hourly buckets
+    # still start on local hours, and daily buckets are local calendar dates.
+    now = now or datetime.now()
+    epoch = int(now.timestamp())
+    epoch -= epoch % OCCUPANCY_SAMPLE_INTERVAL
+    local = datetime.fromtimestamp(epoch)
+    sampled_at = datetime.fromtimestamp(epoch, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    hour_bucket = _hour_bucket(local)
+    day_bucket = local.strftime('%Y-%m-%d')
+    now_utc = now.astimezone(timezone.utc)
+
+    conn = None
+
+    try:
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT lot_id, SUM(status='O'), COUNT(*)
+            FROM parking_spots
+            GROUP BY lot_id
+        """)
+        rows = cur.fetchall()
+
+        for lot_id, occupied, total in rows:
+            cur.execute("""
+                INSERT OR IGNORE INTO occupancy_samples (lot_id, sampled_at, occupied, total)
+                VALUES (?, ?, ?, ?)
+            """, (lot_id, sampled_at, occupied, total))
+            if cur.rowcount == 0:
+                continue
+
+            for table, bucket in (('occupancy_hourly', hour_bucket), ('occupancy_daily', day_bucket)):
+                cur.execute(f"""
+                    INSERT INTO {table} (lot_id, bucket, samples, occupied_sum, peak_occupied, total)
+                    VALUES (?, ?, 1, ?, ?, ?)
+                    ON CONFLICT (lot_id, bucket) DO UPDATE SET
+                        samples = samples + 1,
+                        occupied_sum = occupied_sum + excluded.occupied_sum,
+                        peak_occupied = MAX(peak_occupied, excluded.peak_occupied),
+                        total = excluded.total
+                """, (lot_id, bucket, occupied, occupied, total))
+
+        cur.execute("DELETE FROM occupancy_samples WHERE sampled_at < ?",
+                    ((now_utc - OCCUPANCY_RAW_RETENTION).strftime('%Y-%m-%d %H:%M:%S'),))
+        cur.execute("DELETE FROM occupancy_hourly WHERE bucket < ?",
+                    ((now_utc - OCCUPANCY_HOURLY_RETENTION).strftime('%Y-%m-%d %H:%M:%S'),))
+        cur.execute("DELETE FROM occupancy_daily WHERE bucket < ?",
+                    ((now - OCCUPANCY_DAILY_RETENTION).strftime('%Y-%m-%d'),))
+
+        conn.commit()
+        return len(rows)
+
+    except Exception as e:
+        print(f"Error recording occupancy sample: {e}")
+        return 0
+    finally:
+        if conn:
+            conn.close()
+
+def get_occupancy_curve(lot_id, start, end, resolution='hourly'):
+    if resolution == 'daily':
+        table = 'occupancy_daily'
+        start, end = start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')
+    else:
+        table = 'occupancy_hourly'
+        start, end = _hour_bucket(start), _hour_bucket(end)
+
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT bucket,
+               samples,
+               ROUND(CAST(occupied_sum AS REAL) / samples, 2) as avg_occupied,
+               peak_occupied,
+               total
+        FROM {table}
+        WHERE lot_id=? AND bucket >= ? AND bucket <= ?
+        ORDER BY bucket
+    """, (lot_id, start, end))
+    curve = [dict(row) for row in cur.fetchall()]
+    conn.close()
+
+    if resolution != 'daily':
+        for point in curve:
+            bucket = datetime.strptime(point['bucket'], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+            point['bucket'] = bucket.astimezone().strftime('%Y-%m-%d %H:%M:%S')
+    return curve